@@ -1,7 +1,12 @@
 #!/usr/bin/env python
 # Author: Hardik Rakholiya
 
+import multiprocessing
 import sys
+import time
+
+import numba
+import numpy as np
 
 # Heuristic Functions Used are:
 # Move Ordering: Give preference to moves where a opponent's piece is captured by a less weighted player's piece
@@ -16,211 +21,322 @@ import sys
 # Pawn Structure: give more weight to a state where a parakeet is protected by another parakeet.
 # https://chessprogramming.wikispaces.com/Pawn+Structure
 
-white_pieces = ['P', 'R', 'B', 'Q', 'K', 'N']
-black_pieces = ['p', 'r', 'b', 'q', 'k', 'n']
-single_move_pieces = ['N', 'n', 'K', 'k']
+# integer piece codes: 0 is an empty tile, 1..6 white, 7..12 black
+EMPTY = 0
+WP, WR, WB, WN, WQ, WK = 1, 2, 3, 4, 5, 6
+BP, BR, BB, BN, BQ, BK = 7, 8, 9, 10, 11, 12
+PIECE_CHAR = '.PRBNQKprbnqk'
+PIECE_CODE = {piece: code for code, piece in enumerate(PIECE_CHAR)}
+
+# the codes are laid out so color is an int compare: 1..6 is white
+# (code <= WK), 7..12 is black
+
+# bitboards: square (r, c) is bit r * 8 + c of a 64-bit int
+# https://chessprogramming.wikispaces.com/Bitboards
+FULL_BB = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = 0x8080808080808080
+RANK_2 = 0x000000000000FF00  # white parakeets' home rank
+RANK_7 = 0x00FF000000000000
+PROMO_RANKS = 0xFF000000000000FF  # both back ranks
+
+# preallocated up here so the hot functions below can bind it as a
+# default argument — a fast local load instead of a global dict lookup
+# on every call. A bytearray subscript also yields a plain int, so the
+# generators get piece codes without boxing NumPy scalars on every read
+board = bytearray(64)
+board_np = np.frombuffer(board, dtype=np.uint8)  # zero-copy view for the jitted kernel
+
+piece_bb = [0] * 13  # one bitboard per piece code
+white_occ = 0
+black_occ = 0
+all_occ = 0
+
+
+def build_step_attacks(offsets):
+    table = [0] * 64
+    for sq in range(0, 64):
+        r, c = sq // 8, sq % 8
+        for dr, dc in offsets:
+            if 0 <= r + dr < 8 and 0 <= c + dc < 8:
+                table[sq] |= 1 << ((r + dr) * 8 + c + dc)
+    return table
+
+
+# precomputed attack tables for the single-step pieces, built once at import
+KNIGHT_ATTACKS = build_step_attacks(((-2, -1), (-2, +1), (-1, -2), (-1, +2),
+                                     (+1, -2), (+1, +2), (+2, -1), (+2, +1)))
+KING_ATTACKS = build_step_attacks(((-1, -1), (-1, 0), (-1, +1), (0, -1),
+                                   (0, +1), (+1, -1), (+1, 0), (+1, +1)))
+
+ROOK_DIRS = ((+1, 0), (-1, 0), (0, +1), (0, -1))
+BISHOP_DIRS = ((-1, -1), (-1, +1), (+1, -1), (+1, +1))
+QUEEN_DIRS = ROOK_DIRS + BISHOP_DIRS
+
+# https://chessprogramming.wikispaces.com/Zobrist+Hashing
+# one random key per (piece code, square) plus one for the side to move;
+# the hash is XOR-updated incrementally on every make/unmake
+_zobrist_rng = np.random.RandomState(314159)
+zobrist = _zobrist_rng.randint(0, 2 ** 64, size=(13, 64), dtype=np.uint64).tolist()
+zobrist_side = int(_zobrist_rng.randint(0, 2 ** 64, dtype=np.uint64))
+board_hash = 0
+
+# effectively infinite on the centipawn scale, but still an exact int
+INF = 10 ** 9
+# half-width of the iterative-deepening aspiration window, in centipawns
+ASPIRATION = 50
+
+# https://chessprogramming.wikispaces.com/Transposition+Table
+# fixed-size, always-replace, indexed by the low bits of the hash
+TT_SIZE = 1 << 22
+TT_MASK = TT_SIZE - 1
+TT_EXACT, TT_LOWER, TT_UPPER = 1, 2, 3
+tt = np.zeros(TT_SIZE, dtype=np.dtype([('key', np.uint64), ('depth', np.int16),
+                                       ('flag', np.int8), ('value', np.int64),
+                                       ('best', np.uint16)]))
+
+
+def build_bitboards():
+    global white_occ, black_occ, all_occ, board_hash
+    for piece in range(13):
+        piece_bb[piece] = 0
+    board_hash = 0
+    white_occ = 0
+    black_occ = 0
+    for sq in range(0, 64):
+        piece = board[sq]
+        if piece != EMPTY:
+            piece_bb[piece] |= 1 << sq
+            board_hash ^= zobrist[piece][sq]
+            if piece <= WK:
+                white_occ |= 1 << sq
+            else:
+                black_occ |= 1 << sq
+    all_occ = white_occ | black_occ
+
+
+def update_square(sq, old, new, piece_bb=piece_bb, zobrist=zobrist):
+    global white_occ, black_occ, all_occ, board_hash
+    bit = 1 << sq
+    if old != EMPTY:
+        piece_bb[old] &= ~bit
+        board_hash ^= zobrist[old][sq]
+        if old <= WK:
+            white_occ &= ~bit
+        else:
+            black_occ &= ~bit
+    if new != EMPTY:
+        piece_bb[new] |= bit
+        board_hash ^= zobrist[new][sq]
+        if new <= WK:
+            white_occ |= bit
+        else:
+            black_occ |= bit
+    all_occ = white_occ | black_occ
 
 
 class State:
     def __init__(self, move, player_turn):
         self.move = move
-        self.val = 0.0
+        self.val = 0
         self.player_turn = player_turn
         self.successors = []
+        self.best_move = 0
 
     def get_successors(self):
         if len(self.successors) == 0:
-            moves = possible_moves(player_color if self.player_turn else opponent_color)
-            for move in moves:
-                self.successors.append(State(move, False if self.player_turn else True))
+            color = player_color if self.player_turn else opponent_color
+            for move in possible_moves(color):
+                # keep only legal moves: try it and drop it if it leaves
+                # (or puts) the mover's own king in check
+                make_move(move)
+                legal = not in_check(color)
+                unmake_move(move)
+                if legal:
+                    self.successors.append(State(move, False if self.player_turn else True))
 
         return self.successors
 
 
-class Move:
-    def __init__(self):
-        self.changes = {}
-        self.undo_changes = {}
+# moves are plain ints: from_sq in bits 0..5, to_sq in 6..11, promotion
+# piece in 12..15, captured piece in 16..19, and the ordering score in
+# the bits above that — so sorting the move list descending orders by
+# score and a move needs no heap allocation at all. The low 12 bits
+# double as the compact TT key.
+
+
+def pack_move(from_sq, to_sq, captured, promo=EMPTY, score=0):
+    return from_sq | (to_sq << 6) | (promo << 12) | (captured << 16) | (score << 20)
 
-    def unmake(self):
-        for (r, c) in self.changes:
-            board[r][c] = self.undo_changes[r, c]
 
-    def make(self):
-        for (r, c) in self.changes:
-            board[r][c] = self.changes[r, c]
+def capture_score(victim, attacker):
+    # MVV-LVA in quarter-point units so it packs into the move int
+    return int(64 * abs(pieces_wgt[victim]) - 4 * abs(pieces_wgt[attacker])) // 100
 
-    def add_change(self, r, c, piece):
-        self.undo_changes[r, c] = board[r][c]
-        self.changes[r, c] = piece
 
+def make_move(move, board=board, update_square=update_square, zobrist_side=zobrist_side):
+    global board_hash
+    from_sq = move & 63
+    to_sq = (move >> 6) & 63
+    promo = (move >> 12) & 15
+    captured = (move >> 16) & 15
+    moved = board[from_sq]
+    placed = promo if promo else moved
+    board[to_sq] = placed
+    board[from_sq] = EMPTY
+    update_square(from_sq, moved, EMPTY)
+    update_square(to_sq, captured, placed)
+    board_hash ^= zobrist_side
 
-def possible_moves(color):
+
+def unmake_move(move, board=board, update_square=update_square, zobrist_side=zobrist_side):
+    global board_hash
+    from_sq = move & 63
+    to_sq = (move >> 6) & 63
+    promo = (move >> 12) & 15
+    captured = (move >> 16) & 15
+    placed = board[to_sq]
+    # a promoted piece moved in as the parakeet of its own color
+    moved = (WP if placed <= WK else BP) if promo else placed
+    board[from_sq] = moved
+    board[to_sq] = captured
+    update_square(from_sq, EMPTY, moved)
+    update_square(to_sq, placed, captured)
+    board_hash ^= zobrist_side
+
+
+def possible_moves(color, piece_bb=piece_bb):
     moves = []
 
     if color == 'w':
-        for r in range(0, 8):
-            for c in range(0, 8):
-                if board[r][c] == 'P':
-                    wp_moves(moves, r, c)
-                elif board[r][c] == 'R':
-                    r_moves(moves, color, r, c)
-                elif board[r][c] == 'B':
-                    b_moves(moves, color, r, c)
-                elif board[r][c] == 'N':
-                    n_moves(moves, color, r, c)
-                elif board[r][c] == 'Q':
-                    q_moves(moves, color, r, c)
-                elif board[r][c] == 'K':
-                    k_moves(moves, color, r, c)
-
-    elif color == 'b':
-        for r in range(0, 8):
-            for c in range(0, 8):
-                if board[r][c] == 'p':
-                    bp_moves(moves, r, c)
-                elif board[r][c] == 'r':
-                    r_moves(moves, color, r, c)
-                elif board[r][c] == 'b':
-                    b_moves(moves, color, r, c)
-                elif board[r][c] == 'n':
-                    n_moves(moves, color, r, c)
-                elif board[r][c] == 'q':
-                    q_moves(moves, color, r, c)
-                elif board[r][c] == 'k':
-                    k_moves(moves, color, r, c)
+        wp_moves(moves)
+        movers = WHITE_MOVERS
+    else:
+        bp_moves(moves)
+        movers = BLACK_MOVERS
+
+    for piece, mover in movers:
+        bb = piece_bb[piece]
+        while bb:
+            lsb = bb & -bb
+            sq = lsb.bit_length() - 1
+            mover(moves, color, sq // 8, sq % 8)
+            bb ^= lsb
+
+    # most valuable victim / least valuable attacker ordering: the score
+    # sits in the top bits, so one descending int sort does it
+    moves.sort(reverse=True)
+
     return moves
 
 
-def wp_moves(moves, r, c):
-    r1 = r + 1
-
-    if r1 < 8:
-        # killer moves takes priority
-        if c + 1 < 8 and board[r1][c + 1] in black_pieces:
-            move = Move()
-            move.add_change(r1, c + 1, 'Q' if r1 == 7 else 'P')
-            move.add_change(r, c, '.')
-            moves.insert(0, move)
-
-        # killer moves takes priority
-        if c - 1 > -1 and board[r1][c - 1] in black_pieces:
-            move = Move()
-            move.add_change(r1, c - 1, 'Q' if r1 == 7 else 'P')
-            move.add_change(r, c, '.')
-            moves.insert(0, move)
-
-        if board[r1][c] == '.':
-            move = Move()
-            move.add_change(r1, c, 'Q' if r1 == 7 else 'P')
-            move.add_change(r, c, '.')
-            moves.append(move)
-
-        # first move of the game
-        if r == 1 and board[2][c] == '.' and board[3][c] == '.':
-            move = Move()
-            move.add_change(r + 2, c, 'P')
-            move.add_change(r, c, '.')
-            moves.append(move)
-
-
-def bp_moves(moves, r, c):
-    r1 = r - 1
-
-    if r1 > -1:
-        # killer moves takes priority
-        if c + 1 < 8 and board[r1][c + 1] in white_pieces:
-            move = Move()
-            move.add_change(r1, c + 1, 'q' if r1 == 0 else 'p')
-            move.add_change(r, c, '.')
-            moves.insert(0, move)
-
-        # killer moves takes priority
-        if c - 1 > -1 and board[r1][c - 1] in white_pieces:
-            move = Move()
-            move.add_change(r1, c - 1, 'q' if r1 == 0 else 'p')
-            move.add_change(r, c, '.')
-            moves.insert(0, move)
-
-        if board[r1][c] == '.':
-            move = Move()
-            move.add_change(r1, c, 'q' if r1 == 0 else 'p')
-            move.add_change(r, c, '.')
-            moves.append(move)
-
-        # first move of the game
-        if r == 6 and board[5][c] == '.' and board[4][c] == '.':
-            move = Move()
-            move.add_change(r - 2, c, 'p')
-            move.add_change(r, c, '.')
-            moves.append(move)
+def emit_pawn_moves(moves, targets, shift, piece, queen,
+                    board=board, pack_move=pack_move, capture_score=capture_score):
+    # pop the target squares off the bitboard one lsb at a time
+    while targets:
+        lsb = targets & -targets
+        sq = lsb.bit_length() - 1
+        promo = queen if lsb & PROMO_RANKS else EMPTY
+        captured = board[sq]
+        score = capture_score(captured, piece) if captured else 0
+        if promo:
+            # promotions are nearly as forcing as a queen capture
+            score += 4000
+        moves.append(pack_move(sq - shift, sq, captured, promo, score))
+        targets ^= lsb
+
+
+def wp_moves(moves):
+    wp = piece_bb[WP]
+    empty = ~all_occ & FULL_BB
+
+    # captures, excluding targets that wrapped around the board edge
+    emit_pawn_moves(moves, (wp << 9) & ~FILE_A & black_occ, +9, WP, WQ)
+    emit_pawn_moves(moves, (wp << 7) & ~FILE_H & black_occ, +7, WP, WQ)
+
+    emit_pawn_moves(moves, (wp << 8) & empty, +8, WP, WQ)
+
+    # first move of the game
+    emit_pawn_moves(moves, ((wp & RANK_2) << 8 & empty) << 8 & empty, +16, WP, WP)
+
+
+def bp_moves(moves):
+    bp = piece_bb[BP]
+    empty = ~all_occ & FULL_BB
+
+    # captures, excluding targets that wrapped around the board edge
+    emit_pawn_moves(moves, (bp >> 7) & ~FILE_A & white_occ, -7, BP, BQ)
+    emit_pawn_moves(moves, (bp >> 9) & ~FILE_H & white_occ, -9, BP, BQ)
+
+    emit_pawn_moves(moves, (bp >> 8) & empty, -8, BP, BQ)
+
+    # first move of the game
+    emit_pawn_moves(moves, ((bp & RANK_7) >> 8 & empty) >> 8 & empty, -16, BP, BP)
 
 
 def r_moves(moves, color, r, c):
-    add_move_in_dir(moves, color, r, c, +1, 0)
-    add_move_in_dir(moves, color, r, c, -1, 0)
-    add_move_in_dir(moves, color, r, c, 0, +1)
-    add_move_in_dir(moves, color, r, c, 0, -1)
+    slide_moves(moves, color, r * 8 + c, ROOK_DIRS)
 
 
 def b_moves(moves, color, r, c):
-    for dr in (-1, 1):
-        for dc in (-1, 1):
-            add_move_in_dir(moves, color, r, c, dr, dc)
+    slide_moves(moves, color, r * 8 + c, BISHOP_DIRS)
 
 
 def q_moves(moves, color, r, c):
-    r_moves(moves, color, r, c)
-    b_moves(moves, color, r, c)
+    slide_moves(moves, color, r * 8 + c, QUEEN_DIRS)
+
+
+def slide_moves(moves, color, from_sq, dirs,
+                board=board, pack_move=pack_move, capture_score=capture_score):
+    own_occ, opp_occ = (white_occ, black_occ) if color == 'w' else (black_occ, white_occ)
+    piece = board[from_sq]
+    for dr, dc in dirs:
+        r1 = from_sq // 8 + dr
+        c1 = from_sq % 8 + dc
+        # walk the ray until the board edge or the first blocker
+        while not ((r1 | c1) & ~7):
+            to_sq = r1 * 8 + c1
+            bit = 1 << to_sq
+            if own_occ & bit:
+                break
+            if opp_occ & bit:
+                captured = board[to_sq]
+                moves.append(pack_move(from_sq, to_sq, captured,
+                                       score=capture_score(captured, piece)))
+                break
+            moves.append(pack_move(from_sq, to_sq, EMPTY))
+            r1 += dr
+            c1 += dc
 
 
 def n_moves(moves, color, r, c):
-    for dr in (-2, -1, 1, 2):
-        for dc in (-2, -1, 1, 2):
-            if abs(dr) + abs(dc) is 3:
-                add_move_in_dir(moves, color, r, c, dr, dc)
+    step_moves(moves, color, r * 8 + c, KNIGHT_ATTACKS[r * 8 + c])
 
 
 def k_moves(moves, color, r, c):
-    for dr in range(-1, 2):
-        for dc in range(-1, 2):
-            if abs(dr) + abs(dc) is 1 or 2:
-                add_move_in_dir(moves, color, r, c, dr, dc)
-
-
-def add_move_in_dir(moves, color, r, c, dr, dc, depth=1):
-    r1 = r + depth * dr
-    c1 = c + depth * dc
-
-    if r1 not in range(0, 8) or c1 not in range(0, 8):
-        return
-
-    # player's own piece is blocking the move
-    if (board[r1][c1] in white_pieces and color == 'w') or (board[r1][c1] in black_pieces and color == 'b'):
-        return
-
-    # attack opponent's piece
-    if (board[r1][c1] in black_pieces and color == 'w') or (board[r1][c1] in white_pieces and color == 'b'):
-        move = Move()
-        move.add_change(r1, c1, board[r][c])
-        move.add_change(r, c, '.')
-        if abs(pieces_wgt[board[r1][c1]]) > abs(pieces_wgt[board[r][c]]):
-            # kill moves first
-            moves.insert(0, move)
+    step_moves(moves, color, r * 8 + c, KING_ATTACKS[r * 8 + c])
+
+
+def step_moves(moves, color, from_sq, attacks,
+               board=board, pack_move=pack_move, capture_score=capture_score):
+    own_occ, opp_occ = (white_occ, black_occ) if color == 'w' else (black_occ, white_occ)
+    piece = board[from_sq]
+    targets = attacks & ~own_occ
+    while targets:
+        lsb = targets & -targets
+        to_sq = lsb.bit_length() - 1
+        if opp_occ & lsb:
+            captured = board[to_sq]
+            moves.append(pack_move(from_sq, to_sq, captured,
+                                   score=capture_score(captured, piece)))
         else:
-            moves.append(move)
-        return
-
-    # move to empty tile r1,c1
-    if board[r1][c1] == '.':
-        move = Move()
-        move.add_change(r1, c1, board[r][c])
-        move.add_change(r, c, '.')
-        moves.append(move)
-        if board[r][c] in single_move_pieces:
-            return
-        else:
-            add_move_in_dir(moves, color, r, c, dr, dc, depth + 1)
+            moves.append(pack_move(from_sq, to_sq, EMPTY))
+        targets ^= lsb
+
+
+# per-color dispatch tables, built once instead of on every call
+WHITE_MOVERS = ((WR, r_moves), (WB, b_moves), (WN, n_moves), (WQ, q_moves), (WK, k_moves))
+BLACK_MOVERS = ((BR, r_moves), (BB, b_moves), (BN, n_moves), (BQ, q_moves), (BK, k_moves))
 
 
 material_wgt = 10
@@ -233,125 +349,418 @@ def evaluate(state):
            + mobility_wgt * mobility(state)
 
 
-# based on values at https://en.wikipedia.org/wiki/Chess_piece_relative_value
-pieces_wgt = {'P': +1.0, 'B': +3.5, 'N': +3.5, 'R': +5.25, 'Q': +10.0, 'K': +200.0,
-              'p': -1.0, 'b': -3.5, 'n': -3.5, 'r': -5.25, 'q': -10.0, 'k': -200.0}
+# based on values at https://en.wikipedia.org/wiki/Chess_piece_relative_value,
+# in integer centipawns so every score the search compares is an exact int.
+# indexed by piece code: empty, P, R, B, N, Q, K, then the black pieces negated
+pieces_wgt = np.array([0,
+                       +100, +525, +350, +350, +1000, +20000,
+                       -100, -525, -350, -350, -1000, -20000], dtype=np.int64)
 
 
-def material():
+@numba.njit(cache=True)
+def material_kernel(board, wgt):
     white_pts = 0
-    for row in board:
-        for piece in row:
-            if piece != '.':
-                white_pts += pieces_wgt.get(piece)
+    for sq in range(0, 64):
+        white_pts += wgt[board[sq]]
+
+    return white_pts
 
+
+def material():
+    white_pts = int(material_kernel(board_np, pieces_wgt))
     return white_pts if player_color == 'w' else -1 * white_pts
 
 
-square_values = {
-    (2, 1): 0.25, (2, 2): 0.5, (2, 3): 0.5, (2, 4): 0.5, (2, 5): 0.5, (2, 6): 0.25,
-    (3, 1): 0.25, (3, 2): 0.5, (3, 3): 1.0, (3, 4): 1.0, (3, 5): 0.5, (3, 6): 0.25,
-    (4, 1): 0.25, (4, 2): 0.5, (4, 3): 1.0, (4, 4): 1.0, (4, 5): 0.5, (4, 6): 0.25,
-    (5, 1): 0.25, (5, 2): 0.5, (5, 3): 0.5, (5, 4): 0.5, (5, 5): 0.5, (5, 6): 0.25,
-}
+# center control weights (centipawns) as a dense table indexed by flat
+# square: 100 on the four center squares, 50 on the ring around them,
+# 25 on the rim of that, 0 everywhere else
+square_values = [0] * 64
+for _r in range(2, 6):
+    for _c in range(1, 7):
+        if _r in (3, 4) and _c in (3, 4):
+            square_values[_r * 8 + _c] = 100
+        elif 2 <= _c <= 5:
+            square_values[_r * 8 + _c] = 50
+        else:
+            square_values[_r * 8 + _c] = 25
+
+# one mask per center weight tier, so mobility is three ANDs + popcounts
+CENTER_25 = sum(1 << sq for sq in range(0, 64) if square_values[sq] == 25)
+CENTER_50 = sum(1 << sq for sq in range(0, 64) if square_values[sq] == 50)
+CENTER_100 = sum(1 << sq for sq in range(0, 64) if square_values[sq] == 100)
+
+
+def attacks_bb(color, piece_bb=piece_bb, KNIGHT_ATTACKS=KNIGHT_ATTACKS):
+    # every square attacked by color's pieces (kings excluded, matching
+    # the old move-based mobility term)
+    if color == 'w':
+        pawns = piece_bb[WP]
+        attacks = ((pawns << 9) & ~FILE_A) | ((pawns << 7) & ~FILE_H)
+        knight, rook, bishop, queen = WN, WR, WB, WQ
+    else:
+        pawns = piece_bb[BP]
+        attacks = ((pawns >> 7) & ~FILE_A) | ((pawns >> 9) & ~FILE_H)
+        knight, rook, bishop, queen = BN, BR, BB, BQ
+
+    bb = piece_bb[knight]
+    while bb:
+        lsb = bb & -bb
+        attacks |= KNIGHT_ATTACKS[lsb.bit_length() - 1]
+        bb ^= lsb
+
+    for piece, dirs in ((rook, ROOK_DIRS), (bishop, BISHOP_DIRS), (queen, QUEEN_DIRS)):
+        bb = piece_bb[piece]
+        while bb:
+            lsb = bb & -bb
+            sq = lsb.bit_length() - 1
+            for dr, dc in dirs:
+                r1 = sq // 8 + dr
+                c1 = sq % 8 + dc
+                while not ((r1 | c1) & ~7):
+                    bit = 1 << (r1 * 8 + c1)
+                    attacks |= bit
+                    if all_occ & bit:
+                        break
+                    r1 += dr
+                    c1 += dc
+            bb ^= lsb
+
+    return attacks & FULL_BB
+
+
+def is_square_attacked(sq, by_color, piece_bb=piece_bb,
+                       KNIGHT_ATTACKS=KNIGHT_ATTACKS, KING_ATTACKS=KING_ATTACKS):
+    # attack probe for one square: cheaper than building the full attack
+    # set when only a single answer is needed (check tests)
+    bit = 1 << sq
+    if by_color == 'w':
+        pawns = piece_bb[WP]
+        if ((pawns << 9) & ~FILE_A | (pawns << 7) & ~FILE_H) & bit:
+            return True
+        knight, king = WN, WK
+        rook_queen = piece_bb[WR] | piece_bb[WQ]
+        bishop_queen = piece_bb[WB] | piece_bb[WQ]
+    else:
+        pawns = piece_bb[BP]
+        if ((pawns >> 7) & ~FILE_A | (pawns >> 9) & ~FILE_H) & bit:
+            return True
+        knight, king = BN, BK
+        rook_queen = piece_bb[BR] | piece_bb[BQ]
+        bishop_queen = piece_bb[BB] | piece_bb[BQ]
+
+    if KNIGHT_ATTACKS[sq] & piece_bb[knight] or KING_ATTACKS[sq] & piece_bb[king]:
+        return True
+
+    for dirs, sliders in ((ROOK_DIRS, rook_queen), (BISHOP_DIRS, bishop_queen)):
+        if not sliders:
+            continue
+        for dr, dc in dirs:
+            r1 = sq // 8 + dr
+            c1 = sq % 8 + dc
+            # the first blocker on the ray decides: their slider or not
+            while not ((r1 | c1) & ~7):
+                blocker = 1 << (r1 * 8 + c1)
+                if all_occ & blocker:
+                    if sliders & blocker:
+                        return True
+                    break
+                r1 += dr
+                c1 += dc
+
+    return False
+
+
+def in_check(color):
+    king = piece_bb[WK] if color == 'w' else piece_bb[BK]
+    return bool(king) and is_square_attacked(king.bit_length() - 1,
+                                             'b' if color == 'w' else 'w')
 
 
 def mobility(state):
-    m = 0.0
-    for next in state.get_successors():
-        for key in next.move.changes:
-            if next.move.changes[key] not in ['.', 'K', 'k'] and key in square_values:
-                m += square_values[key]
+    attacks = attacks_bb(player_color if state.player_turn else opponent_color)
+    m = 25 * (attacks & CENTER_25).bit_count() \
+        + 50 * (attacks & CENTER_50).bit_count() \
+        + 100 * (attacks & CENTER_100).bit_count()
 
     return m if state.player_turn else -1 * m
 
 
 def pawn_structure(state):
-    pts = 0.0
-    if state.player_turn:
-        if player_color == 'w':
-            for r in range(0, 8):
-                for c in range(0, 8):
-                    if board[r][c] == 'P':
-                        ur = r - 1
-                        lc = c - 1
-                        rc = c + 1
-                        if ur in range(0, 8) and lc in range(0, 8) and board[ur][lc] == 'P':
-                            pts += 1
-                        if ur in range(0, 8) and rc in range(0, 8) and board[ur][rc] == 'P':
-                            pts += 1
-
-        else:
-            for r in range(0, 8):
-                for c in range(0, 8):
-                    if board[r][c] == 'p':
-                        dr = r + 1
-                        lc = c - 1
-                        rc = c + 1
-                        if dr in range(0, 8) and lc in range(0, 8) and board[dr][lc] == 'p':
-                            pts += 1
-                        if dr in range(0, 8) and rc in range(0, 8) and board[dr][rc] == 'p':
-                            pts += 1
-
-    return pts
+    # count parakeets protected by another parakeet one rank behind: a
+    # protector's two capture shifts landing on a friendly parakeet, so
+    # the whole term is two shifts and two popcounts on the parakeet
+    # bitboard (the file masks drop pairs that wrapped around the edge)
+    if not state.player_turn:
+        return 0
+    if player_color == 'w':
+        wp = piece_bb[WP]
+        return 100 * (((wp << 9) & ~FILE_A & wp).bit_count()
+                      + ((wp << 7) & ~FILE_H & wp).bit_count())
+    bp = piece_bb[BP]
+    return 100 * (((bp >> 7) & ~FILE_A & bp).bit_count()
+                  + ((bp >> 9) & ~FILE_H & bp).bit_count())
 
 
 def is_game_over(state):
     if state.move is not None:
-        for key in state.move.undo_changes:
-            if state.move.undo_changes[key] == 'K' and state.move.changes[key] in black_pieces:
-                return True
-            elif state.move.undo_changes[key] == 'k' and state.move.changes[key] in white_pieces:
-                return True
+        captured = (state.move >> 16) & 15
+        return captured == WK or captured == BK
     return False
 
 
-def alphabeta(state, depth, alpha=-float('inf'), beta=+float('inf')):
-    if depth == 0 or is_game_over(state):
+def quiesce(state, alpha, beta,
+            make_move=make_move, unmake_move=unmake_move,
+            possible_moves=possible_moves, evaluate=evaluate,
+            is_game_over=is_game_over):
+    # https://www.chessprogramming.org/Quiescence_Search: at the fixed-
+    # depth horizon keep resolving captures, so a leaf never gets scored
+    # in the middle of a piece exchange (the horizon effect). Standing
+    # pat is always allowed: the side to move may decline every capture
+    stand_pat = evaluate(state)
+    state.val = stand_pat
+    if is_game_over(state):
+        return stand_pat
+    if state.player_turn:
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        for move in possible_moves(player_color):
+            if not move & 0xF0000:
+                continue
+            make_move(move)
+            val = quiesce(State(move, False), alpha, beta)
+            unmake_move(move)
+            if val > state.val:
+                state.val = val
+            if val > alpha:
+                alpha = val
+            if beta <= alpha:
+                break
+    else:
+        if stand_pat <= alpha:
+            return stand_pat
+        if stand_pat < beta:
+            beta = stand_pat
+        for move in possible_moves(opponent_color):
+            if not move & 0xF0000:
+                continue
+            make_move(move)
+            val = quiesce(State(move, True), alpha, beta)
+            unmake_move(move)
+            if val < state.val:
+                state.val = val
+            if val < beta:
+                beta = val
+            if beta <= alpha:
+                break
+    return state.val
+
+
+def alphabeta(state, depth, alpha=-INF, beta=+INF,
+              tt=tt, make_move=make_move, unmake_move=unmake_move,
+              evaluate=evaluate, is_game_over=is_game_over, quiesce=quiesce):
+    global board_hash
+    if is_game_over(state):
         state.val = evaluate(state)
         return state.val
+    if depth == 0:
+        state.val = quiesce(state, alpha, beta)
+        return state.val
+
+    index = board_hash & TT_MASK
+    entry = tt[index]
+    tt_move = 0
+    if entry['key'] == board_hash:
+        if entry['depth'] >= depth:
+            val = int(entry['value'])
+            if entry['flag'] == TT_EXACT \
+                    or (entry['flag'] == TT_LOWER and val >= beta) \
+                    or (entry['flag'] == TT_UPPER and val <= alpha):
+                state.val = val
+                state.best_move = int(entry['best'])
+                return val
+        # too shallow (or wrong bound) to cut off, but its best move is
+        # still the best guess for ordering
+        tt_move = int(entry['best'])
+
+    # https://www.chessprogramming.org/Null_Move_Pruning: hand the other
+    # side a free move at reduced depth; if the score still busts the
+    # window, a real move surely would too. Skipped at the root and right
+    # after another null move (state.move is None for both), in check,
+    # and when the mover has only parakeets left (zugzwang). With an
+    # infinite bound the fail-high test can never trigger, so skip it
+    if depth >= 3 and state.move is not None \
+            and (beta < INF if state.player_turn else alpha > -INF):
+        side = player_color if state.player_turn else opponent_color
+        if side == 'w':
+            heavy = white_occ & ~(piece_bb[WP] | piece_bb[WK])
+        else:
+            heavy = black_occ & ~(piece_bb[BP] | piece_bb[BK])
+        if heavy and not in_check(side):
+            board_hash ^= zobrist_side
+            null_state = State(None, not state.player_turn)
+            if state.player_turn:
+                val = alphabeta(null_state, depth - 3, beta - 1, beta)
+            else:
+                val = alphabeta(null_state, depth - 3, alpha, alpha + 1)
+            board_hash ^= zobrist_side
+            if state.player_turn and val >= beta:
+                state.val = val
+                return val
+            if not state.player_turn and val <= alpha:
+                state.val = val
+                return val
+
+    successors = state.get_successors()
+    if not successors:
+        # no legal moves: mate if the king is attacked, else stalemate
+        side = player_color if state.player_turn else opponent_color
+        if in_check(side):
+            state.val = -INF if state.player_turn else +INF
+        else:
+            state.val = 0
+        return state.val
+    if tt_move:
+        for i in range(len(successors)):
+            if successors[i].move & 0xFFF == tt_move:
+                if i:
+                    successors.insert(0, successors.pop(i))
+                break
+
+    alpha_orig = alpha
+    beta_orig = beta
+    best = 0
     if state.player_turn:
-        state.val = -float('inf')
-        for next_state in state.get_successors():
+        state.val = -INF
+        for i, next_state in enumerate(successors):
 
             # https://chessprogramming.wikispaces.com/Unmake+Move
-            next_state.move.make()
-            state.val = max(state.val, alphabeta(next_state, depth - 1, alpha, beta))
-            next_state.move.unmake()
+            make_move(next_state.move)
+            if i >= 3 and depth >= 3 and not next_state.move & 0xF0000:
+                # late move reduction: quiet moves sorted this far back
+                # rarely matter, so try them a ply shallower first
+                val = alphabeta(next_state, depth - 2, alpha, beta)
+                if val > alpha:
+                    val = alphabeta(next_state, depth - 1, alpha, beta)
+            else:
+                val = alphabeta(next_state, depth - 1, alpha, beta)
+            unmake_move(next_state.move)
+            if val > state.val:
+                state.val = val
+                best = next_state.move & 0xFFF
             alpha = max(alpha, state.val)
             if beta <= alpha:
                 break
-        return state.val
     else:
-        state.val = +float('inf')
-        for next_state in state.get_successors():
-            next_state.move.make()
-            state.val = min(state.val, alphabeta(next_state, depth - 1, alpha, beta))
-            next_state.move.unmake()
+        state.val = +INF
+        for i, next_state in enumerate(successors):
+            make_move(next_state.move)
+            if i >= 3 and depth >= 3 and not next_state.move & 0xF0000:
+                val = alphabeta(next_state, depth - 2, alpha, beta)
+                if val < beta:
+                    val = alphabeta(next_state, depth - 1, alpha, beta)
+            else:
+                val = alphabeta(next_state, depth - 1, alpha, beta)
+            unmake_move(next_state.move)
+            if val < state.val:
+                state.val = val
+                best = next_state.move & 0xFFF
             beta = min(beta, state.val)
             if beta <= alpha:
                 break
+
+    if state.val <= alpha_orig:
+        flag = TT_UPPER
+    elif state.val >= beta_orig:
+        flag = TT_LOWER
+    else:
+        flag = TT_EXACT
+    tt[index] = (board_hash, depth, flag, state.val, best)
+    state.best_move = best
+    return state.val
+
+
+def _scout_root_move(args):
+    # runs in a forked worker whose board, bitboards and transposition
+    # table are private copies of the parent's root position
+    move, depth, alpha, beta = args
+    make_move(move)
+    val = alphabeta(State(move, False), depth, alpha, beta)
+    unmake_move(move)
+    return val
+
+
+def root_search(state, depth, pool, alpha=-INF, beta=+INF):
+    # https://www.chessprogramming.org/Young_Brothers_Wait_Concept: the
+    # root moves are independent searches, so after the first (and
+    # probably best) move sets alpha serially, the brothers are scouted
+    # in parallel on a minimal window and only the ones that beat alpha
+    # get an exact re-search
+    successors = state.get_successors()
+    if not successors:
+        state.val = -INF if in_check(player_color) else 0
         return state.val
 
+    # the previous iteration's best move goes first
+    if state.best_move:
+        for i in range(len(successors)):
+            if successors[i].move & 0xFFF == state.best_move:
+                if i:
+                    successors.insert(0, successors.pop(i))
+                break
+
+    first = successors[0]
+    make_move(first.move)
+    state.val = alphabeta(first, depth - 1, alpha, beta)
+    unmake_move(first.move)
+    best = first.move & 0xFFF
+    alpha = max(alpha, state.val)
+
+    rest = successors[1:]
+    if pool is not None and rest and alpha < beta:
+        vals = pool.map(_scout_root_move,
+                        [(s.move, depth - 1, alpha, alpha + 1) for s in rest])
+        for next_state, val in zip(rest, vals):
+            if val > alpha:
+                make_move(next_state.move)
+                val = alphabeta(next_state, depth - 1, alpha, beta)
+                unmake_move(next_state.move)
+                if val > state.val:
+                    state.val = val
+                    best = next_state.move & 0xFFF
+                    alpha = val
+                if beta <= alpha:
+                    break
+    else:
+        for next_state in rest:
+            make_move(next_state.move)
+            val = alphabeta(next_state, depth - 1, alpha, beta)
+            unmake_move(next_state.move)
+            if val > state.val:
+                state.val = val
+                best = next_state.move & 0xFFF
+                alpha = max(alpha, val)
+            if beta <= alpha:
+                break
+
+    state.best_move = best
+    return state.val
 
-def get_2d_board(strBoard):
-    tiles = []
-    for r in range(0, 8):
-        row = []
-        for c in range(0, 8):
-            row.append(strBoard[r * 8 + c])
-        tiles.append(row)
 
-    return tiles
+def load_board(strBoard):
+    # filled in place, so the bytearray bound into the hot functions
+    # (and the NumPy view over it) stays the same object
+    for sq in range(0, 64):
+        board[sq] = PIECE_CODE[strBoard[sq]]
 
 
 def printout():
     string = ''
-    for r in range(0, 8):
-        for c in range(0, 8):
-            string += board[r][c]
+    for sq in range(0, 64):
+        string += PIECE_CHAR[board[sq]]
 
-    print string
+    print(string)
 
 
 piece_symbols = {'P': u'\u2659',
@@ -375,32 +784,49 @@ def view():
     for r in range(0, 8):
         string += str(r)
         for c in range(0, 8):
-            string += ' ' + piece_symbols[board[r][c]]
+            string += ' ' + piece_symbols[PIECE_CHAR[board[r * 8 + c]]]
         string += '\n'
 
-    print string
+    print(string)
 
 
 # get the file path from script parameters
 player_color = sys.argv[1]
 opponent_color = 'b' if player_color == 'w' else 'w'
-board = get_2d_board(sys.argv[2])
+load_board(sys.argv[2])
+# optional wall-clock budget in seconds (default 10)
+time_budget = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+build_bitboards()
 current = State(None, True)
-
-# board = get_2d_board('........'
-#                      '........'
-#                      'R..P....'
-#                      'p.k.....'
-#                      '........'
-#                      '........'
-#                      '........'
-#                      'k.r.....')
-
+# forked after setup so every worker inherits the root position and the
+# precomputed tables; single-core machines skip the pool overhead
+pool = multiprocessing.Pool() if multiprocessing.cpu_count() > 1 else None
+
+# load_board('........'
+#               '........'
+#               'R..P....'
+#               'p.k.....'
+#               '........'
+#               '........'
+#               '........'
+#               'k.r.....')
+
+start = time.monotonic()
+prev = 0
 for d in range(2, 102):
-    score = alphabeta(current, d)
+    # aspiration window: search inside a narrow window around the last
+    # iteration's score; a result at either edge means the true value
+    # lies outside, so that depth is re-searched with the full window
+    score = root_search(current, d, pool, prev - ASPIRATION, prev + ASPIRATION)
+    if score <= prev - ASPIRATION or score >= prev + ASPIRATION:
+        score = root_search(current, d, pool)
+    prev = score
     for next_state in current.get_successors():
-        if next_state.val == current.val:
-            next_state.move.make()
+        # the searched best move, not a score-equality rediscovery of it
+        if next_state.move & 0xFFF == current.best_move:
+            make_move(next_state.move)
             printout()
-            next_state.move.unmake()
+            unmake_move(next_state.move)
             break
+    if time.monotonic() - start > time_budget:
+        break